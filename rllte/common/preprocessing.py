@@ -22,8 +22,10 @@
 # SOFTWARE.
 # =============================================================================
 
+import math
 import warnings
-from typing import Dict, Tuple, Union
+import weakref
+from typing import Any, Callable, Dict, Optional, Tuple, Type, Union
 
 import gymnasium as gym
 import numpy as np
@@ -33,6 +35,41 @@ from torch.nn import functional as F
 
 ObsShape = Union[Tuple[int, ...], Dict[str, Tuple[int, ...]]]
 
+# caches of values computed from observation spaces, keyed by the id of the space
+_PREPROCESS_OBS_FNS: Dict[int, Tuple[weakref.ref, Callable]] = {}
+_IMAGE_BOUNDS: Dict[int, Tuple[weakref.ref, bool]] = {}
+
+
+def _process_multibinary_action_space(action_space: spaces.MultiBinary) -> Tuple[int, int, str]:
+    """Process the MultiBinary action space, which must be one-dimensional."""
+    assert isinstance(
+        action_space.n, int
+    ), "Multi-dimensional MultiBinary action space is not supported. You can flatten it instead."
+    return int(action_space.n), int(action_space.n), "MultiBinary"
+
+
+# handlers of the supported spaces, looked up by the type of the space
+_OBSERVATION_SPACE_HANDLERS: Dict[Type[gym.Space], Callable[[Any], ObsShape]] = {
+    # Observation is a vector
+    spaces.Box: lambda space: space.shape,
+    # Observation is an int
+    spaces.Discrete: lambda space: (1,),
+    # Number of discrete features
+    spaces.MultiDiscrete: lambda space: (int(len(space.nvec)),),
+    # Number of binary features
+    spaces.MultiBinary: lambda space: space.shape,
+    spaces.Dict: lambda space: {
+        key: process_observation_space(subspace) for (key, subspace) in space.spaces.items()  # type: ignore[misc]
+    },
+}
+# each handler returns the action dim, the policy action dim and the action type
+_ACTION_SPACE_HANDLERS: Dict[Type[gym.Space], Callable[[Any], Tuple[int, int, str]]] = {
+    spaces.Discrete: lambda space: (1, int(space.n), "Discrete"),
+    spaces.Box: lambda space: (math.prod(space.shape), math.prod(space.shape), "Box"),
+    spaces.MultiDiscrete: lambda space: (int(len(space.nvec)), int(space.nvec.sum()), "MultiDiscrete"),
+    spaces.MultiBinary: _process_multibinary_action_space,
+}
+
 
 def process_observation_space(observation_space: gym.Space) -> ObsShape:
     """Process the observation space.
@@ -43,26 +80,12 @@ def process_observation_space(observation_space: gym.Space) -> ObsShape:
     Returns:
         Information of the observation space.
     """
-    if isinstance(observation_space, spaces.Box):
-        # Observation is a vector
-        return observation_space.shape
-    elif isinstance(observation_space, spaces.Discrete):
-        # Observation is an int
-        return (1,)
-    elif isinstance(observation_space, spaces.MultiDiscrete):
-        # Number of discrete features
-        return (int(len(observation_space.nvec)),)
-    elif isinstance(observation_space, spaces.MultiBinary):
-        # Number of binary features
-        return observation_space.shape
-    elif isinstance(observation_space, spaces.Dict):
-        return {
-            key: process_observation_space(subspace)  # type: ignore[misc]
-            for (key, subspace) in observation_space.spaces.items()
-        }
-    else:
+    handler = _get_space_handler(_OBSERVATION_SPACE_HANDLERS, observation_space)
+    if handler is None:
         raise NotImplementedError(f"{observation_space} observation space is not supported")
 
+    return handler(observation_space)
+
 
 def process_action_space(action_space: gym.Space) -> Tuple[Tuple[int, ...], int, int, str]:
     """Get the dimension of the action space.
@@ -75,30 +98,12 @@ def process_action_space(action_space: gym.Space) -> Tuple[Tuple[int, ...], int,
     """
     # TODO: revise the action_range
     assert action_space.shape is not None, "The action data shape cannot be `None`!"
-    action_shape = action_space.shape
-    if isinstance(action_space, spaces.Discrete):
-        policy_action_dim = int(action_space.n)
-        action_dim = 1
-        action_type = "Discrete"
-    elif isinstance(action_space, spaces.Box):
-        policy_action_dim = int(np.prod(action_space.shape))
-        action_dim = policy_action_dim
-        action_type = "Box"
-    elif isinstance(action_space, spaces.MultiDiscrete):
-        policy_action_dim = sum(list(action_space.nvec))
-        action_dim = int(len(action_space.nvec))
-        action_type = "MultiDiscrete"
-    elif isinstance(action_space, spaces.MultiBinary):
-        assert isinstance(
-            action_space.n, int
-        ), "Multi-dimensional MultiBinary action space is not supported. You can flatten it instead."
-        policy_action_dim = int(action_space.n)
-        action_dim = policy_action_dim
-        action_type = "MultiBinary"
-    else:
+    handler = _get_space_handler(_ACTION_SPACE_HANDLERS, action_space)
+    if handler is None:
         raise NotImplementedError(f"{action_space} action space is not supported")
+    action_dim, policy_action_dim, action_type = handler(action_space)
 
-    return action_shape, action_dim, policy_action_dim, action_type
+    return action_space.shape, action_dim, policy_action_dim, action_type
 
 
 def get_flattened_obs_dim(observation_space: spaces.Space) -> int:
@@ -112,7 +117,7 @@ def get_flattened_obs_dim(observation_space: spaces.Space) -> int:
         The dimension of the observation space when flattened.
     """
     if isinstance(observation_space, spaces.MultiDiscrete):
-        return sum(observation_space.nvec)
+        return int(observation_space.nvec.sum())
     else:
         # Use Gym internal method
         return spaces.utils.flatdim(observation_space)
@@ -132,7 +137,8 @@ def is_image_space_channels_first(observation_space: spaces.Box) -> bool:
     Returns:
         True if observation space is channels-first image, False if channels-last.
     """
-    smallest_dimension = np.argmin(observation_space.shape).item()
+    shape = observation_space.shape
+    smallest_dimension = min(range(len(shape)), key=shape.__getitem__)
     if smallest_dimension == 1:
         warnings.warn("Treating image space as channels-last, while second dimension was smallest of the three.")
     return smallest_dimension == 0
@@ -164,9 +170,8 @@ def is_image_space(observation_space: gym.Space, check_channels: bool = False, n
         if check_dtype and observation_space.dtype != np.uint8:
             return False
 
-        # Check the value range
-        incorrect_bounds = np.any(observation_space.low != 0) or np.any(observation_space.high != 255)
-        if check_bounds and incorrect_bounds:
+        # Check the value range, which is only computed once per space
+        if check_bounds and not _get_cached(_IMAGE_BOUNDS, observation_space, _has_image_bounds):
             return False
 
         # Skip channels check
@@ -182,12 +187,24 @@ def is_image_space(observation_space: gym.Space, check_channels: bool = False, n
     return False
 
 
-def preprocess_obs(obs: th.Tensor, observation_space: gym.Space) -> Union[th.Tensor, Dict[str, th.Tensor]]:
-    """Observations preprocessing function.
+def get_preprocess_obs_fn(observation_space: gym.Space) -> Callable[[th.Tensor], Union[th.Tensor, Dict[str, th.Tensor]]]:
+    """Get the observations preprocessing function of an observation space. The function is built
+        once per observation space and cached, so that the space is not inspected again for each batch.
+
+    Args:
+        observation_space (gym.Space): Observation space.
+
+    Returns:
+        A function to preprocess observations.
+    """
+    return _get_cached(_PREPROCESS_OBS_FNS, observation_space, _make_preprocess_obs_fn)
+
+
+def _make_preprocess_obs_fn(observation_space: gym.Space) -> Callable[[th.Tensor], Union[th.Tensor, Dict[str, th.Tensor]]]:
+    """Build the observations preprocessing function of an observation space.
         Borrowed from: https://github.com/DLR-RM/stable-baselines3/blob/master/stable_baselines3/common/preprocessing.py#L92
 
     Args:
-        obs (th.Tensor): Observation.
         observation_space (gym.Space): Observation space.
 
     Returns:
@@ -195,33 +212,108 @@ def preprocess_obs(obs: th.Tensor, observation_space: gym.Space) -> Union[th.Ten
     """
     if isinstance(observation_space, spaces.Box):
         if is_image_space(observation_space):
-            return obs.float() / 255.0
-        return obs.float()
+            # dividing the uint8 tensor directly casts and scales in a single pass
+            return lambda obs: obs / 255.0
+        return lambda obs: obs.float()
 
     elif isinstance(observation_space, spaces.Discrete):
-        # One hot encoding and convert to float to avoid errors
-        return F.one_hot(obs.long(), num_classes=observation_space.n).float()
+        # One hot encoding written directly as float, instead of converting an int64 encoding
+        n = int(observation_space.n)
+        return lambda obs: th.zeros((*obs.shape, n), device=obs.device).scatter_(-1, obs.long().unsqueeze(-1), 1.0)
 
     elif isinstance(observation_space, spaces.MultiDiscrete):
-        # Tensor concatenation of one hot encodings of each Categorical sub-space
-        return th.cat(
-            [
-                F.one_hot(obs_.long(), num_classes=int(observation_space.nvec[idx])).float()
-                for idx, obs_ in enumerate(th.split(obs.long(), 1, dim=1))
-            ],
-            dim=-1,
-        ).view(obs.shape[0], sum(observation_space.nvec))
+        # Concatenated one hot encodings of each Categorical sub-space, written with a single scatter
+        nvec = th.as_tensor(observation_space.nvec, dtype=th.long)
+        total = int(nvec.sum())
+        offsets = {th.device("cpu"): th.cumsum(F.pad(nvec[:-1], (1, 0)), dim=0)}
+
+        def _multi_discrete_to_one_hot(obs: th.Tensor) -> th.Tensor:
+            if obs.device not in offsets:
+                offsets[obs.device] = offsets[th.device("cpu")].to(obs.device)
+            one_hot = th.zeros((obs.shape[0], total), device=obs.device)
+            return one_hot.scatter_(1, obs.long() + offsets[obs.device], 1.0)
+
+        return _multi_discrete_to_one_hot
 
     elif isinstance(observation_space, spaces.MultiBinary):
-        return obs.float()
+        return lambda obs: obs.float()
 
     elif isinstance(observation_space, spaces.Dict):
-        # Do not modify by reference the original observation
-        assert isinstance(obs, Dict), f"Expected dict, got {type(obs)}"
-        preprocessed_obs = {}
-        for key, _obs in obs.items():
-            preprocessed_obs[key] = preprocess_obs(_obs, observation_space[key])
-        return preprocessed_obs
+        preprocess_fns = {key: get_preprocess_obs_fn(subspace) for key, subspace in observation_space.spaces.items()}
+
+        def _preprocess_dict_obs(obs: Dict[str, th.Tensor]) -> Dict[str, th.Tensor]:
+            # Do not modify by reference the original observation
+            assert isinstance(obs, Dict), f"Expected dict, got {type(obs)}"
+            return {key: preprocess_fns[key](_obs) for key, _obs in obs.items()}  # type: ignore[misc]
+
+        return _preprocess_dict_obs
 
     else:
         raise NotImplementedError(f"Preprocessing not implemented for {observation_space}")
+
+
+def preprocess_obs(obs: th.Tensor, observation_space: gym.Space) -> Union[th.Tensor, Dict[str, th.Tensor]]:
+    """Observations preprocessing function.
+        Borrowed from: https://github.com/DLR-RM/stable-baselines3/blob/master/stable_baselines3/common/preprocessing.py#L92
+
+    Args:
+        obs (th.Tensor): Observation.
+        observation_space (gym.Space): Observation space.
+
+    Returns:
+        A function to preprocess observations.
+    """
+    return get_preprocess_obs_fn(observation_space)(obs)
+
+
+def _get_cached(cache: Dict[int, Tuple[weakref.ref, Any]], space: gym.Space, fn: Callable[[gym.Space], Any]) -> Any:
+    """Get the value computed by `fn` for a space, caching it by the id of the space.
+        Gymnasium spaces are not hashable, so a weak reference checks that the cached entry
+        belongs to this space and drops it once the space is garbage collected.
+
+    Args:
+        cache (Dict[int, Tuple[weakref.ref, Any]]): The cache.
+        space (gym.Space): The space.
+        fn (Callable[[gym.Space], Any]): Function to compute the value.
+
+    Returns:
+        The cached value.
+    """
+    key = id(space)
+    if key in cache:
+        space_ref, value = cache[key]
+        if space_ref() is space:
+            return value
+
+    value = fn(space)
+    cache[key] = (weakref.ref(space, lambda _: cache.pop(key, None)), value)
+
+    return value
+
+
+def _has_image_bounds(observation_space: spaces.Box) -> bool:
+    """Check if the bounds of a Box space are [0, 255].
+
+    Args:
+        observation_space (spaces.Box): Observation space.
+
+    Returns:
+        True if all the lower bounds are 0 and all the upper bounds are 255.
+    """
+    return bool(np.all(observation_space.low == 0) and np.all(observation_space.high == 255))
+
+
+def _get_space_handler(handlers: Dict[Type[gym.Space], Callable], space: gym.Space) -> Optional[Callable]:
+    """Get the handler of a space, falling back to the handlers of its base classes.
+
+    Args:
+        handlers (Dict[Type[gym.Space], Callable]): Handlers of the supported spaces.
+        space (gym.Space): The space.
+
+    Returns:
+        The handler, or None if the space is not supported.
+    """
+    for space_type in type(space).__mro__:
+        if space_type in handlers:
+            return handlers[space_type]
+    return None
@@ -124,8 +124,13 @@ def get_episode_statistics(infos: Dict) -> Tuple[List, List]:
         Episode rewards and lengths.
     """
     if "episode" in infos.keys():
-        indices = np.nonzero(infos["episode"]["l"])
-        return infos["episode"]["r"][indices].tolist(), infos["episode"]["l"][indices].tolist()
+        rewards, lengths = infos["episode"]["r"], infos["episode"]["l"]
+        if isinstance(lengths, th.Tensor):
+            # the statistics kept on the device are fetched by a single transfer
+            rewards, lengths = th.stack([rewards.float(), lengths.float()]).cpu().numpy()
+            lengths = lengths.astype(np.int64)
+        indices = np.nonzero(lengths)
+        return rewards[indices].tolist(), lengths[indices].tolist()
     elif "final_info" in infos.keys():
         r: List = []
         l: List = []
@@ -49,6 +49,7 @@ except Exception:
 
 try:
     from .minigrid import make_minigrid_env as make_minigrid_env
+    from .minigrid import make_torch_minigrid_env as make_torch_minigrid_env
 except Exception:
     pass
 
@@ -23,15 +23,39 @@
 # =============================================================================
 
 
-from typing import Callable, Dict
+from typing import Any, Callable, Dict, Optional, Tuple
 
 import gymnasium as gym
 import numpy as np
-from gymnasium.vector import AsyncVectorEnv, SyncVectorEnv
-from gymnasium.wrappers import RecordEpisodeStatistics
+import torch as th
+from gymnasium.vector import AsyncVectorEnv
 from minigrid.wrappers import DictObservationSpaceWrapper, FlatObsWrapper, FullyObsWrapper
 
-from rllte.env.utils import FrameStack, Gymnasium2Torch
+from rllte.env.utils import Gymnasium2Torch, RecordEpisodeStatistics4VecEnv, TorchSyncVectorEnv
+
+# axes permutation from channels last to channels first
+_CHW_AXES = (2, 0, 1)
+
+# try to load numba
+try:
+    from numba import njit  # type: ignore
+
+    NUMBA_AVAILABLE = True
+except Exception:
+    NUMBA_AVAILABLE = False
+
+
+def _hwc_to_chw(src: np.ndarray, dst: np.ndarray) -> None:
+    """Transpose an image from channels last to channels first into `dst`."""
+    height, width, channels = src.shape
+    for c in range(channels):
+        for h in range(height):
+            for w in range(width):
+                dst[c, h, w] = src[h, w, c]
+
+
+if NUMBA_AVAILABLE:
+    _hwc_to_chw = njit(cache=True, boundscheck=False)(_hwc_to_chw)
 
 
 class Minigrid2Image(gym.ObservationWrapper):
@@ -46,18 +70,22 @@ class Minigrid2Image(gym.ObservationWrapper):
 
     def __init__(self, env: gym.Env) -> None:
         gym.ObservationWrapper.__init__(self, env)
-        self.observation_space = env.observation_space["image"]
-        shape = self.observation_space.shape
+        image_space = env.observation_space["image"]
         self.observation_space = gym.spaces.Box(
             low=0,
             high=255,
-            shape=(shape[2], shape[0], shape[1]),
-            dtype=self.observation_space.dtype,
+            shape=tuple(image_space.shape[axis] for axis in _CHW_AXES),
+            dtype=image_space.dtype,
         )
 
     def observation(self, observation: Dict) -> np.ndarray:
         """Convert MiniGrid observation to image."""
-        return np.transpose(observation["image"], axes=[2, 0, 1])
+        # a fresh contiguous array, since the frames are kept by `FrameStack` and `final_observation`
+        if NUMBA_AVAILABLE:
+            image = np.empty(self.observation_space.shape, dtype=self.observation_space.dtype)
+            _hwc_to_chw(observation["image"], image)
+            return image
+        return np.ascontiguousarray(observation["image"].transpose(_CHW_AXES))
 
 
 class ImageTranspose(gym.ObservationWrapper):
@@ -83,7 +111,7 @@ class ImageTranspose(gym.ObservationWrapper):
 
     def observation(self, observation: Dict) -> Dict[str, np.ndarray]:
         """Convert MiniGrid observation to image."""
-        observation["image"] = np.transpose(observation["image"], axes=[2, 0, 1])
+        observation["image"] = np.ascontiguousarray(observation["image"].transpose(_CHW_AXES))
         return observation
 
 
@@ -123,7 +151,6 @@ def make_minigrid_env(
             if fully_observable:
                 env = FullyObsWrapper(env)
                 env = Minigrid2Image(env)
-                env = FrameStack(env, k=frame_stack)
             elif fully_numerical:
                 env = DictObservationSpaceWrapper(env)
                 env = ImageTranspose(env)
@@ -139,10 +166,188 @@ def make_minigrid_env(
 
     envs = [make_env(env_id, seed + i) for i in range(num_envs)]
 
-    if asynchronous:
+    if asynchronous and num_envs > 1:
         envs = AsyncVectorEnv(envs)
     else:
-        envs = SyncVectorEnv(envs)
-    envs = RecordEpisodeStatistics(envs)
+        envs = TorchSyncVectorEnv(envs)
+    envs = RecordEpisodeStatistics4VecEnv(envs)
+
+    # the frames are stacked on the device instead of in each sub-environment
+    return Gymnasium2Torch(envs, device=device, frame_stack=frame_stack if fully_observable else 1)
+
+
+# the `Empty` environments whose layout is static and can be stepped as tensors
+_TORCH_MINIGRID_ENVS = {
+    "MiniGrid-Empty-5x5-v0": dict(size=5),
+    "MiniGrid-Empty-Random-5x5-v0": dict(size=5, random_start=True),
+    "MiniGrid-Empty-6x6-v0": dict(size=6),
+    "MiniGrid-Empty-Random-6x6-v0": dict(size=6, random_start=True),
+    "MiniGrid-Empty-8x8-v0": dict(size=8),
+    "MiniGrid-Empty-16x16-v0": dict(size=16),
+}
+
+# indices of the compact grid encoding of MiniGrid
+_EMPTY, _WALL, _FLOOR, _GOAL, _LAVA, _AGENT = 1, 2, 3, 8, 9, 10
+_RED, _GREEN, _GREY = 0, 1, 5
+_LEFT, _RIGHT, _FORWARD = 0, 1, 2
+
+
+class TorchMinigridEnv:
+    """Batched MiniGrid `Empty` environments whose states are tensors on the device, so that all the
+        environments are stepped by a few tensor operations without any host round-trip. The observations
+        are the same as the ones of `FullyObsWrapper` followed by `Minigrid2Image`.
+
+    Args:
+        num_envs (int): Number of environments.
+        size (int): Size of the grid, including the surrounding walls.
+        random_start (bool): Whether to start at a random position and direction instead of (1, 1) facing right.
+        max_steps (Optional[int]): Maximum number of steps per episode, defaults to `4 * size**2`.
+        device (str): Device on which the environments are run.
+        seed (int): Random seed.
+
+    Returns:
+        TorchMinigridEnv instance.
+    """
+
+    def __init__(
+        self,
+        num_envs: int = 8,
+        size: int = 8,
+        random_start: bool = False,
+        max_steps: Optional[int] = None,
+        device: str = "cpu",
+        seed: int = 0,
+    ) -> None:
+        self.num_envs = num_envs
+        self.device = th.device(device)
+        self.random_start = random_start
+        self.max_steps = max_steps or 4 * size**2
+        self.observation_space = gym.spaces.Box(low=0, high=255, shape=(3, size, size), dtype=np.uint8)
+        self.action_space = gym.spaces.Discrete(7)
+
+        # static layout indexed by (x, y): surrounding walls and the goal in the bottom-right corner
+        layout = th.zeros((size, size, 3), dtype=th.uint8)
+        layout[..., 0] = _EMPTY
+        for border in (layout[0], layout[-1], layout[:, 0], layout[:, -1]):
+            border[:] = th.tensor([_WALL, _GREY, 0], dtype=th.uint8)
+        layout[size - 2, size - 2] = th.tensor([_GOAL, _GREEN, 0], dtype=th.uint8)
+        self._layout = layout.to(self.device)
+        self._empty_cells = (self._layout[..., 0] == _EMPTY).nonzero()
+        # objects the agent can move onto
+        self._can_overlap = th.zeros(_AGENT + 1, dtype=th.bool, device=self.device)
+        self._can_overlap[[_EMPTY, _FLOOR, _GOAL, _LAVA]] = True
+        self._dir_to_vec = th.as_tensor([[1, 0], [0, 1], [-1, 0], [0, -1]], device=self.device)
+
+        self._generator = th.Generator(device=self.device)
+        self._generator.manual_seed(seed)
+        self._env_indices = th.arange(num_envs, device=self.device)
+        self._agent_pos = th.ones((num_envs, 2), dtype=th.long, device=self.device)
+        self._agent_dir = th.zeros(num_envs, dtype=th.long, device=self.device)
+        self._step_count = th.zeros(num_envs, dtype=th.long, device=self.device)
+        self._episode_returns = th.zeros(num_envs, dtype=th.float32, device=self.device)
+
+    def reset(self, seed: Optional[int] = None, options: Optional[dict] = None) -> Tuple[th.Tensor, Dict]:
+        """Reset all environments and return a batch of initial observations and info.
+
+        Args:
+            seed (int): The random seed.
+            options (Optional[dict]): Unused.
+
+        Returns:
+            First observations and info.
+        """
+        if seed is not None:
+            self._generator.manual_seed(seed)
+        self._reset_envs(th.ones(self.num_envs, dtype=th.bool, device=self.device))
+
+        return self._get_obs(), {}
+
+    def step(self, actions: th.Tensor) -> Tuple[th.Tensor, th.Tensor, th.Tensor, th.Tensor, Dict[str, Any]]:
+        """Take an action for each environment, resetting the finished ones automatically.
+
+        Args:
+            actions (th.Tensor): Batch of actions.
+
+        Returns:
+            Next observations, rewards, terminateds, truncateds, infos.
+        """
+        actions = actions.view(-1).long()
+        self._step_count += 1
+
+        fwd_pos = self._agent_pos + self._dir_to_vec[self._agent_dir]
+        fwd_obj = self._layout[fwd_pos[:, 0], fwd_pos[:, 1], 0].long()
+        forward = actions == _FORWARD
+        self._agent_pos = th.where((forward & self._can_overlap[fwd_obj]).unsqueeze(1), fwd_pos, self._agent_pos)
+        self._agent_dir = th.where(actions == _LEFT, (self._agent_dir - 1) % 4, self._agent_dir)
+        self._agent_dir = th.where(actions == _RIGHT, (self._agent_dir + 1) % 4, self._agent_dir)
+
+        reached_goal = forward & (fwd_obj == _GOAL)
+        terminateds = reached_goal | (forward & (fwd_obj == _LAVA))
+        truncateds = self._step_count >= self.max_steps
+        rewards = th.where(reached_goal, 1.0 - 0.9 * (self._step_count / self.max_steps), 0.0).float()
+        dones = terminateds | truncateds
+
+        self._episode_returns += rewards
+        infos = {
+            "final_observation": self._get_obs(),
+            # kept on the device, see `rllte.common.utils.get_episode_statistics`
+            "episode": {
+                "r": th.where(dones, self._episode_returns, 0.0),
+                "l": th.where(dones, self._step_count, 0),
+            },
+        }
+        self._reset_envs(dones)
+
+        return self._get_obs(), rewards, terminateds.float(), truncateds.float(), infos
+
+    def close(self) -> None:
+        """Close the environments."""
+
+    def _reset_envs(self, mask: th.Tensor) -> None:
+        """Reset the environments selected by a boolean mask, without synchronizing with the host."""
+        if self.random_start:
+            cells = th.randint(
+                len(self._empty_cells), (self.num_envs,), generator=self._generator, device=self.device
+            )
+            start_pos = self._empty_cells[cells]
+            start_dir = th.randint(4, (self.num_envs,), generator=self._generator, device=self.device)
+        else:
+            start_pos = th.ones_like(self._agent_pos)
+            start_dir = th.zeros_like(self._agent_dir)
+
+        self._agent_pos = th.where(mask.unsqueeze(1), start_pos, self._agent_pos)
+        self._agent_dir = th.where(mask, start_dir, self._agent_dir)
+        self._step_count = th.where(mask, 0, self._step_count)
+        self._episode_returns = th.where(mask, 0.0, self._episode_returns)
+
+    def _get_obs(self) -> th.Tensor:
+        """Encode the grids with the agents as channels-first images."""
+        grids = self._layout.expand(self.num_envs, -1, -1, -1).clone()
+        agents = th.stack(
+            [th.full_like(self._agent_dir, _AGENT), th.full_like(self._agent_dir, _RED), self._agent_dir], dim=1
+        )
+        grids[self._env_indices, self._agent_pos[:, 0], self._agent_pos[:, 1]] = agents.to(th.uint8)
+        return grids.permute(0, 3, 1, 2).contiguous()
+
+
+def make_torch_minigrid_env(
+    env_id: str = "MiniGrid-Empty-8x8-v0",
+    num_envs: int = 8,
+    seed: int = 0,
+    device: str = "cpu",
+) -> TorchMinigridEnv:
+    """Create batched MiniGrid environments that run as tensor operations on the device.
+        Only the `Empty` environments, whose layout is static, are supported.
+
+    Args:
+        env_id (str): Name of environment.
+        num_envs (int): Number of environments.
+        seed (int): Random seed.
+        device (str): Device on which the environments are run.
+
+    Returns:
+        The vectorized environments.
+    """
+    assert env_id in _TORCH_MINIGRID_ENVS, f"Unsupported environment `{env_id}`, use one of {list(_TORCH_MINIGRID_ENVS)}!"
 
-    return Gymnasium2Torch(envs, device=device)
+    return TorchMinigridEnv(num_envs=num_envs, device=device, seed=seed, **_TORCH_MINIGRID_ENVS[env_id])
@@ -22,19 +22,222 @@
 # SOFTWARE.
 # =============================================================================
 
+import multiprocessing as mp
+import selectors
 from collections import deque
-from typing import Any, Callable, Dict, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 import envpool
 import gymnasium as gym
 import numpy as np
 import torch as th
 from gymnasium.vector import AsyncVectorEnv, SyncVectorEnv, VectorEnv
+from gymnasium.vector.async_vector_env import AsyncState
+from gymnasium.vector.utils import iterate
 from gymnasium.wrappers import RecordEpisodeStatistics
 
 GymObs = Union[th.Tensor, Dict[str, th.Tensor]]
 
 
+class AsyncBatchVectorEnv(AsyncVectorEnv):
+    """Vectorized environments that run in subprocesses and return the first `batch_size` environments
+        that finish stepping, following the `send`/`recv` scheme of `EnvPool`. The remaining environments
+        keep stepping in the background, so a slow step or reset no longer stalls the whole batch.
+        The ids of the returned environments are stored in `infos["env_id"]`, and the environments
+        held back by `reset` are returned by the following steps as reset results, i.e., with their
+        initial observations, zero rewards and `infos["reset"]` set.
+        This is a standalone API in the style of `EnvPool`: the rows of consecutive batches belong to
+        different environments, so any per-environment state must be keyed by `infos["env_id"]`.
+        `Gymnasium2Torch` and the rllte agents store the transitions by row, and thus only accept
+        `batch_size == num_envs`.
+
+    Args:
+        env_fns (Sequence[Callable[[], gym.Env]]): Functions that create the environments.
+        batch_size (Optional[int]): Number of environments returned by each `reset` and `step`.
+            Defaults to the number of environments, which makes it behave like `AsyncVectorEnv`.
+
+    Returns:
+        AsyncBatchVectorEnv instance.
+    """
+
+    def __init__(self, env_fns: Sequence[Callable[[], gym.Env]], batch_size: Optional[int] = None) -> None:
+        super().__init__(env_fns)
+        self.batch_size = batch_size or self.num_envs
+        assert 0 < self.batch_size <= self.num_envs, "The `batch_size` must be in [1, num_envs]!"
+
+        self._selector = selectors.DefaultSelector()
+        for idx, pipe in enumerate(self.parent_pipes):
+            self._selector.register(pipe, selectors.EVENT_READ, idx)
+        # ids of the environments returned by the last `reset` or `step`, their actions come next
+        self._env_ids = np.arange(self.batch_size)
+        # environments that are still stepping in their workers
+        self._pending: List[int] = []
+        # environments whose results have been received but not returned yet
+        self._ready: deque = deque()
+        self._results: Dict[int, Tuple[float, bool, bool, Dict]] = {}
+
+    def reset_async(self, seed: Optional[Union[int, List[int]]] = None, options: Optional[dict] = None) -> None:
+        """Send the calls to `reset` to each sub-environment, discarding the results not returned yet."""
+        self._drain()
+        self._ready.clear()
+        self._results.clear()
+        super().reset_async(seed=seed, options=options)
+
+    def reset_wait(
+        self, timeout: Optional[Union[int, float]] = None, seed: Optional[int] = None, options: Optional[dict] = None
+    ) -> Tuple[Any, Dict]:
+        """Wait for the calls to `reset` to finish and return the first batch of observations."""
+        observations, infos = super().reset_wait(timeout=timeout, seed=seed, options=options)
+        if self.batch_size == self.num_envs:
+            return observations, infos
+
+        # the environments beyond the first batch are returned by the following steps as reset results
+        self._ready = deque(range(self.batch_size, self.num_envs))
+        self._results = {idx: (0.0, False, False, {"reset": True}) for idx in self._ready}
+        self._env_ids = np.arange(self.batch_size)
+        infos = {key: value[: self.batch_size] for key, value in infos.items()}
+        infos["env_id"] = self._env_ids
+        return self._take(observations, self._env_ids), infos
+
+    def step_async(self, actions: np.ndarray) -> None:
+        """Send the actions to the environments returned by the last `reset` or `step`.
+
+        Args:
+            actions (np.ndarray): Batch of actions with the size of `batch_size`.
+
+        Returns:
+            None.
+        """
+        self._assert_is_running()
+        assert len(actions) == len(self._env_ids), f"Expected {len(self._env_ids)} actions, got {len(actions)}!"
+        for idx, action in zip(self._env_ids, iterate(self.action_space, actions)):
+            self.parent_pipes[idx].send(("step", action))
+            self._pending.append(idx)
+        self._state = AsyncState.WAITING_STEP
+
+    def step_wait(self, timeout: Optional[Union[int, float]] = None) -> Tuple[Any, np.ndarray, np.ndarray, np.ndarray, Dict]:
+        """Wait until `batch_size` environments finish stepping.
+
+        Args:
+            timeout (Optional[Union[int, float]]): Timeout of each `select` call.
+
+        Returns:
+            Observations, rewards, terminateds, truncateds and infos of the ready environments.
+        """
+        self._assert_is_running()
+        while len(self._ready) < self.batch_size:
+            self._recv(timeout)
+        self._state = AsyncState.DEFAULT
+
+        env_ids = np.sort([self._ready.popleft() for _ in range(self.batch_size)])
+        rewards, terminateds, truncateds, infos = [], [], [], {}
+        for i, idx in enumerate(env_ids):
+            rew, terminated, truncated, info = self._results.pop(idx)
+            rewards.append(rew)
+            terminateds.append(terminated)
+            truncateds.append(truncated)
+            infos = self._add_info(infos, info, i)
+        self._env_ids = env_ids
+
+        if self.batch_size == self.num_envs:
+            observations = self._take(self.observations, slice(None))
+        else:
+            observations = self._take(self.observations, env_ids)
+            infos = {key: value[: self.batch_size] for key, value in infos.items()}
+            infos["env_id"] = env_ids
+
+        return (
+            observations,
+            np.array(rewards),
+            np.array(terminateds, dtype=np.bool_),
+            np.array(truncateds, dtype=np.bool_),
+            infos,
+        )
+
+    def call_async(self, name: str, *args, **kwargs) -> None:
+        """Call a method of each sub-environment once all pending steps are done."""
+        self._drain()
+        super().call_async(name, *args, **kwargs)
+
+    def set_attr(self, name: str, values: Union[List, Tuple, object]) -> None:
+        """Set an attribute of each sub-environment once all pending steps are done."""
+        self._drain()
+        super().set_attr(name, values)
+
+    def close_extras(self, timeout: Optional[Union[int, float]] = None, terminate: bool = False) -> None:
+        """Close the environments and the selector."""
+        if not terminate:
+            self._drain()
+        self._state = AsyncState.DEFAULT
+        super().close_extras(timeout=timeout, terminate=terminate)
+        self._selector.close()
+
+    def _recv(self, timeout: Optional[Union[int, float]] = None) -> None:
+        """Receive the results of all the environments that are ready."""
+        events = self._selector.select(timeout)
+        if not events:
+            raise mp.TimeoutError(f"No environment finished stepping after {timeout} second(s).")
+
+        for key, _ in events:
+            idx = key.data
+            result, success = self.parent_pipes[idx].recv()
+            self._pending.remove(idx)
+            if not success:
+                self._selector.unregister(self.parent_pipes[idx])
+                self._raise_if_errors([i != idx for i in range(self.num_envs)])
+            _, rew, terminated, truncated, info = result
+            self._results[idx] = (rew, terminated, truncated, info)
+            self._ready.append(idx)
+
+    def _drain(self) -> None:
+        """Wait for all the pending steps so that the pipes are free for other commands.
+        The received results are kept and returned by the following steps."""
+        while self._pending:
+            self._recv()
+        self._state = AsyncState.DEFAULT
+
+    @staticmethod
+    def _take(observations: Any, indices: Union[np.ndarray, slice]) -> Any:
+        """Copy the observations of the given environments out of the shared memory."""
+        if isinstance(observations, dict):
+            return {key: np.array(value[indices]) for key, value in observations.items()}
+        return np.array(observations[indices])
+
+
+class TorchSyncVectorEnv(SyncVectorEnv):
+    """Vectorized environments that run serially and take the actions as torch tensors or numpy arrays.
+        Discrete actions are fetched in bulk as python integers, so that no per-environment indexing of
+        a tensor or an array (and no per-environment device synchronization) is needed.
+
+    Args:
+        env_fns (Sequence[Callable[[], gym.Env]]): Functions that create the environments.
+
+    Returns:
+        TorchSyncVectorEnv instance.
+    """
+
+    def __init__(self, env_fns: Sequence[Callable[[], gym.Env]]) -> None:
+        super().__init__(env_fns)
+        self._discrete_actions = isinstance(self.single_action_space, gym.spaces.Discrete)
+
+    def step_async(self, actions: Union[th.Tensor, np.ndarray]) -> None:
+        """Set the actions taken by the following `step_wait`.
+
+        Args:
+            actions (Union[th.Tensor, np.ndarray]): Batch of actions, on any device.
+
+        Returns:
+            None.
+        """
+        if self._discrete_actions:
+            # one transfer for the whole batch instead of one per environment
+            self._actions = actions.reshape(-1).tolist()
+        elif isinstance(actions, th.Tensor):
+            super().step_async(actions.cpu().numpy())
+        else:
+            super().step_async(actions)
+
+
 class EnvPoolAsync2Gymnasium(gym.Wrapper):
     """Create an `EnvPool` environment with asynchronous mode, and wrap it
         to allow a modular transformation of the `step` and `reset` methods.
@@ -109,6 +312,69 @@ class EnvPoolSync2Gymnasium(gym.Wrapper):
         return self.env.step(actions)
 
 
+class RecordEpisodeStatistics4VecEnv(gym.Wrapper):
+    """Keep track of cumulative rewards and episode lengths of vectorized environments
+        with numpy accumulators updated in place. Partial batches are supported through `infos["env_id"]`.
+
+    Args:
+        env (VectorEnv): The vectorized environments.
+        deque_size (int): The size of the buffers :attr:`return_queue` and :attr:`length_queue`.
+
+    Returns:
+        RecordEpisodeStatistics4VecEnv instance.
+    """
+
+    def __init__(self, env: VectorEnv, deque_size: int = 100) -> None:
+        super().__init__(env)
+        self.num_envs = env.num_envs
+        self.episode_count = 0
+        self.episode_returns = np.zeros(self.num_envs, dtype=np.float32)
+        self.episode_lengths = np.zeros(self.num_envs, dtype=np.int32)
+        # ring buffers of the last `deque_size` finished episodes
+        self.return_queue = np.zeros(deque_size, dtype=np.float32)
+        self.length_queue = np.zeros(deque_size, dtype=np.int32)
+
+    def reset(self, **kwargs) -> Tuple[Any, Dict]:
+        """Reset the environments and the accumulators."""
+        observations, infos = super().reset(**kwargs)
+        self.episode_returns[:] = 0
+        self.episode_lengths[:] = 0
+        return observations, infos
+
+    def step(self, actions: np.ndarray) -> Tuple[Any, np.ndarray, np.ndarray, np.ndarray, Dict]:
+        """Step the environments and record the statistics of the finished episodes.
+
+        Args:
+            actions (np.ndarray): Batch of actions.
+
+        Returns:
+            Observations, rewards, terminateds, truncateds and infos.
+        """
+        observations, rewards, terms, truncs, infos = super().step(actions)
+        env_ids = infos.get("env_id", np.arange(len(rewards)))
+        # the environments held back by `reset` are returned without taking any step
+        stepped = ~infos["_reset"] if "reset" in infos else slice(None)
+        self.episode_returns[env_ids[stepped]] += rewards[stepped]
+        self.episode_lengths[env_ids[stepped]] += 1
+
+        dones = np.logical_or(terms, truncs)
+        episode_returns = self.episode_returns[env_ids]
+        episode_lengths = self.episode_lengths[env_ids]
+        infos["episode"] = {"r": np.where(dones, episode_returns, 0.0), "l": np.where(dones, episode_lengths, 0)}
+        infos["_episode"] = dones
+
+        num_dones = int(dones.sum())
+        if num_dones > 0:
+            indices = (self.episode_count + np.arange(num_dones)) % len(self.return_queue)
+            self.return_queue[indices] = episode_returns[dones]
+            self.length_queue[indices] = episode_lengths[dones]
+            self.episode_count += num_dones
+            self.episode_returns[env_ids[dones]] = 0
+            self.episode_lengths[env_ids[dones]] = 0
+
+        return observations, rewards, terms, truncs, infos
+
+
 class Gymnasium2Torch(gym.Wrapper):
     """Env wrapper for processing gymnasium environments and outputting torch tensors.
 
@@ -116,25 +382,61 @@ class Gymnasium2Torch(gym.Wrapper):
         env (VectorEnv): The vectorized environments.
         device (str): Device (cpu, cuda, ...) on which the code should be run.
         envpool (bool): Whether to use `EnvPool` env.
+        frame_stack (int): Number of frames stacked on the device along the first observation dimension.
 
     Returns:
         Gymnasium2Torch wrapper.
     """
 
-    def __init__(self, env: VectorEnv, device: str, envpool: bool = False) -> None:
+    def __init__(self, env: VectorEnv, device: str, envpool: bool = False, frame_stack: int = 1) -> None:
         super().__init__(env)
+        # the agents store the transitions by row, which requires the same environment in each row
+        assert envpool or not isinstance(env.unwrapped, AsyncBatchVectorEnv) or (
+            env.unwrapped.batch_size == env.num_envs
+        ), "Partial batches of `AsyncBatchVectorEnv` are not supported, use `batch_size == num_envs`!"
         self.num_envs = env.num_envs
         self.device = th.device(device)
+        # bound methods of the wrapped env, looked up once instead of at every call
+        self._reset = env.reset
+        self._step = env.step
+        # `TorchSyncVectorEnv` fetches discrete actions by itself with a single `tolist`,
+        # the other actions go through the pinned action buffer of `_to_numpy`
+        self._torch_actions = (
+            not envpool
+            and isinstance(env.unwrapped, TorchSyncVectorEnv)
+            and isinstance(env.unwrapped.single_action_space, gym.spaces.Discrete)
+        )
 
         # envpool's observation space and action space are the same as the single env.
         if not envpool:
             self.observation_space = env.single_observation_space
             self.action_space = env.single_action_space
 
+        # the stacked frames are kept in a ring buffer of shape (num_envs, frame_stack, *obs_shape)
+        self.frame_stack = frame_stack
+        self._frames: Optional[th.Tensor] = None
+        self._heads = np.zeros(self.num_envs, dtype=np.int64)
+        if frame_stack > 1:
+            assert isinstance(self.observation_space, gym.spaces.Box), "Frame stacking requires a Box observation space!"
+            shape = self.observation_space.shape
+            self.observation_space = gym.spaces.Box(
+                low=0,
+                high=255,
+                shape=((shape[0] * frame_stack,) + shape[1:]),
+                dtype=self.observation_space.dtype,
+            )
+
+        # on GPU, the data is staged in pinned host buffers and copied on a side stream,
+        # so that the host-to-device transfers overlap with the following env steps.
+        self._pin_memory = self.device.type == "cuda"
+        self._host_buffers: Dict[str, Tuple[th.Tensor, Any]] = {}
+        if self._pin_memory:
+            self._copy_stream = th.cuda.Stream(device=self.device)
+
         if isinstance(self.observation_space, gym.spaces.Dict):
-            self._format_obs = lambda x: {key: th.as_tensor(item, device=self.device) for key, item in x.items()}
+            self._format_obs = lambda x: self._to_tensor_dict("obs", x)
         else:
-            self._format_obs = lambda x: th.as_tensor(x, device=self.device)
+            self._format_obs = lambda x: self._to_tensor("obs", x)
 
     def reset(self, seed: Optional[int] = None, options: Optional[dict] = None) -> Tuple[GymObs, Dict]:
         """Reset all environments and return a batch of initial observations and info.
@@ -146,9 +448,20 @@ class Gymnasium2Torch(gym.Wrapper):
         Returns:
             First observations and info.
         """
-        obs, infos = self.env.reset(seed=seed, options=options)
+        obs, infos = self._reset(seed=seed, options=options)
+        obs = self._format_obs(obs)
+
+        if self.frame_stack > 1:
+            if self._frames is None:
+                self._frames = th.zeros(
+                    (self.num_envs, self.frame_stack, *obs.shape[1:]), dtype=obs.dtype, device=self.device
+                )
+            env_ids = infos.get("env_id", np.arange(obs.shape[0]))
+            self._frames[env_ids] = obs.unsqueeze(1)
+            self._heads[env_ids] = 0
+            obs = self._get_stacked_obs(env_ids)
 
-        return self._format_obs(obs), infos
+        return obs, infos
 
     def step(self, actions: th.Tensor) -> Tuple[GymObs, th.Tensor, th.Tensor, th.Tensor, Dict[str, Any]]:
         """Take an action for each environment.
@@ -159,27 +472,191 @@ class Gymnasium2Torch(gym.Wrapper):
         Returns:
             Next observations, rewards, terminateds, truncateds, infos.
         """
-        new_observations, rewards, terminateds, truncateds, infos = self.env.step(actions.cpu().numpy())
+        new_observations, rewards, terminateds, truncateds, infos = self._step(
+            actions if self._torch_actions else self._to_numpy(actions)
+        )
         # TODO: get real next observations
         # for idx, (term, trunc) in enumerate(zip(terminateds, truncateds)):
         #     if term or trunc:
         #         new_obs[idx] = info['final_observation'][idx]
 
-        # convert to tensor
-        rewards = th.as_tensor(rewards, dtype=th.float32, device=self.device)
+        if self.frame_stack > 1:
+            dones = np.flatnonzero(np.logical_or(terminateds, truncateds))
 
-        terminateds = th.as_tensor(
-            [1.0 if _ else 0.0 for _ in terminateds],
-            dtype=th.float32,
-            device=self.device,
-        )
-        truncateds = th.as_tensor(
-            [1.0 if _ else 0.0 for _ in truncateds],
-            dtype=th.float32,
-            device=self.device,
-        )
+        # convert to tensor, casting the numpy arrays once instead of building python lists
+        rewards = self._to_tensor("rewards", np.asarray(rewards, dtype=np.float32))
+        terminateds = self._to_tensor("terminateds", np.asarray(terminateds, dtype=np.float32))
+        truncateds = self._to_tensor("truncateds", np.asarray(truncateds, dtype=np.float32))
+        new_observations = self._format_obs(new_observations)
+
+        if self.frame_stack > 1:
+            new_observations = self._stack_frames(new_observations, dones, infos)
+
+        return new_observations, rewards, terminateds, truncateds, infos
+
+    def _stack_frames(self, obs: th.Tensor, dones: np.ndarray, infos: Dict[str, Any]) -> th.Tensor:
+        """Push the new frames into the ring buffer and return the stacked observations.
+
+        Args:
+            obs (th.Tensor): New observations.
+            dones (np.ndarray): Indices of the environments that have been reset automatically.
+            infos (Dict[str, Any]): Infos of the environments.
+
+        Returns:
+            Stacked observations.
+        """
+        assert self._frames is not None, "The environments must be reset before stepping!"
+        env_ids = infos.get("env_id", np.arange(obs.shape[0]))
+        heads = (self._heads[env_ids] + 1) % self.frame_stack
+        self._heads[env_ids] = heads
+        self._frames[env_ids, heads] = obs
+
+        if len(dones) > 0:
+            # stack the final frames of the finished episodes, then restart their stacks
+            # with the first frames of the new episodes as done by `FrameStack.reset`.
+            done_ids = env_ids[dones]
+            final_obs = np.stack(infos["final_observation"][dones])
+            # episodes end rarely and in varying numbers, which would reallocate a pinned buffer each time
+            self._frames[done_ids, heads[dones]] = th.as_tensor(final_obs, device=self.device)
+            for idx, stacked_final_obs in zip(dones, self._get_stacked_obs(done_ids)):
+                infos["final_observation"][idx] = stacked_final_obs
+            self._frames[done_ids] = obs[dones].unsqueeze(1)
+
+        return self._get_stacked_obs(env_ids)
+
+    def _get_stacked_obs(self, env_ids: np.ndarray) -> th.Tensor:
+        """Gather the frames of the given environments from the oldest to the newest.
+
+        Args:
+            env_ids (np.ndarray): Indices of the environments.
+
+        Returns:
+            Stacked observations.
+        """
+        assert self._frames is not None
+        order = (self._heads[env_ids, None] + np.arange(1, self.frame_stack + 1)) % self.frame_stack
+        frames = self._frames[env_ids[:, None], order]
+        return frames.view(len(env_ids), -1, *frames.shape[3:])
+
+    def _to_numpy(self, actions: th.Tensor) -> np.ndarray:
+        """Convert the actions to a numpy array for the environments.
+
+        Args:
+            actions (th.Tensor): Batch of actions.
+
+        Returns:
+            The actions as a numpy array.
+        """
+        if not self._pin_memory or actions.device.type != "cuda":
+            return actions.cpu().numpy()
+
+        # copy the actions into a pinned host buffer that is reused across steps
+        buffer, event = self._host_buffers.get("actions", (None, None))
+        if buffer is None or buffer.shape != actions.shape or buffer.dtype != actions.dtype:
+            buffer, event = th.empty(actions.shape, dtype=actions.dtype, pin_memory=True), th.cuda.Event()
+            self._host_buffers["actions"] = (buffer, event)
+        buffer.copy_(actions, non_blocking=True)
+        # the environments read the actions on the host, so the copy must be done here
+        event.record()
+        event.synchronize()
+
+        return buffer.numpy()
+
+    def _to_tensor(self, name: str, array: np.ndarray) -> th.Tensor:
+        """Convert an array to a tensor on the device.
+
+        Args:
+            name (str): Name of the host buffer used for staging the array.
+            array (np.ndarray): The array to convert.
+
+        Returns:
+            The converted tensor.
+        """
+        if not self._pin_memory:
+            return th.as_tensor(array, device=self.device)
+
+        array = np.asarray(array)
+        buffer, event = self._get_host_buffer(name, array.shape, array.dtype)
+        np.copyto(buffer.numpy(), array)
+
+        return self._copy_to_device(buffer, event)
+
+    def _to_tensor_dict(self, name: str, arrays: Dict[str, np.ndarray]) -> Dict[str, th.Tensor]:
+        """Convert a dict of arrays to tensors on the device. On GPU, the arrays are packed into
+            one flat host buffer, so that all of them are moved by a single transfer.
+
+        Args:
+            name (str): Name of the host buffer used for staging the arrays.
+            arrays (Dict[str, np.ndarray]): The arrays to convert.
+
+        Returns:
+            The converted tensors, which are views of one flat tensor on GPU.
+        """
+        if not self._pin_memory:
+            return {key: th.as_tensor(array, device=self.device) for key, array in arrays.items()}
+
+        arrays = {key: np.asarray(array) for key, array in arrays.items()}
+        # byte ranges of the arrays, aligned so that each range can be viewed with the dtype of its array
+        ranges: Dict[str, slice] = {}
+        total = 0
+        for key, array in arrays.items():
+            start = -(-total // array.itemsize) * array.itemsize
+            total = start + array.nbytes
+            ranges[key] = slice(start, total)
+
+        buffer, event = self._get_host_buffer(name, (total,), np.dtype(np.uint8))
+        flat = buffer.numpy()
+        host_views = {}
+        for key, array in arrays.items():
+            host_views[key] = flat[ranges[key]].view(array.dtype).reshape(array.shape)
+            np.copyto(host_views[key], array)
+        tensor = self._copy_to_device(buffer, event)
+
+        return {
+            key: tensor[ranges[key]].view(th.from_numpy(host_view).dtype).view(host_view.shape)
+            for key, host_view in host_views.items()
+        }
+
+    def _get_host_buffer(self, name: str, shape: Tuple[int, ...], dtype: np.dtype) -> Tuple[th.Tensor, Any]:
+        """Get a pinned host buffer that is free to be overwritten, allocating it if needed.
+
+        Args:
+            name (str): Name of the host buffer.
+            shape (Tuple[int, ...]): Shape of the host buffer.
+            dtype (np.dtype): Data type of the host buffer.
+
+        Returns:
+            The host buffer and the event recorded after its last copy.
+        """
+        buffer, event = self._host_buffers.get(name, (None, None))
+        if buffer is None or buffer.shape != shape or buffer.numpy().dtype != dtype:
+            buffer, event = th.from_numpy(np.empty(shape, dtype=dtype)).pin_memory(), th.cuda.Event()
+            self._host_buffers[name] = (buffer, event)
+        else:
+            # the previous copy from this buffer must finish before it is overwritten
+            event.synchronize()
+
+        return buffer, event
+
+    def _copy_to_device(self, buffer: th.Tensor, event: Any) -> th.Tensor:
+        """Copy a pinned host buffer to the device on the side stream.
+
+        Args:
+            buffer (th.Tensor): The pinned host buffer.
+            event (Any): The event recorded after the copy.
+
+        Returns:
+            The tensor on the device.
+        """
+        with th.cuda.stream(self._copy_stream):
+            tensor = buffer.to(self.device, non_blocking=True)
+            event.record()
+        # make the compute stream wait for the copy without blocking the host
+        current_stream = th.cuda.current_stream(self.device)
+        current_stream.wait_stream(self._copy_stream)
+        tensor.record_stream(current_stream)
 
-        return self._format_obs(new_observations), rewards, terminateds, truncateds, infos
+        return tensor
 
 
 class FrameStack(gym.Wrapper):
@@ -235,10 +712,10 @@ class DistributedWrapper:
         self.env = env
         self.episode_return = None
         self.episode_step = None
-        if env.action_space.__class__.__name__ == "Discrete":
+        if isinstance(env.action_space, gym.spaces.Discrete):
             self.action_type = "Discrete"
             self.action_dim = 1
-        elif env.action_space.__class__.__name__ == "Box":
+        elif isinstance(env.action_space, gym.spaces.Box):
             self.action_type = "Box"
             self.action_dim = env.action_space.shape[0]
         else:
@@ -339,7 +816,7 @@ def make_rllte_env(
         num_envs (int): Number of environments.
         seed (int): Random seed.
         device (str): Device to convert data.
-        asynchronous (bool): `True` for `AsyncVectorEnv` and `False` for `SyncVectorEnv`.
+        asynchronous (bool): `True` for `AsyncVectorEnv` and `False` for `TorchSyncVectorEnv`.
         env_kwargs: Optional keyword argument to pass to the env constructor.
 
     Returns:
@@ -371,7 +848,7 @@ def make_rllte_env(
     if asynchronous:
         envs = AsyncVectorEnv(env_fns)
     else:
-        envs = SyncVectorEnv(env_fns)
+        envs = TorchSyncVectorEnv(env_fns)
 
     envs = RecordEpisodeStatistics(envs)
 
@@ -141,7 +141,7 @@ class OffPolicyDetActorDoubleCritic(BasePolicy):
 
     def _clamp(self, x: th.Tensor, eps: float = 1e-6) -> th.Tensor:
         """Clamps the input to the range [low, high]."""
-        clamped_x = th.clamp(x, self.action_space.low[0] + eps, self.action_space.high[0] - eps)
+        clamped_x = th.clamp(x, self.action_space.low.flat[0].item() + eps, self.action_space.high.flat[0].item() - eps)
         x = x - x.detach() + clamped_x.detach()
         return x
 
@@ -1,5 +1,10 @@
+import gymnasium as gym
+import numpy as np
 import pytest
 import torch as th
+from gymnasium.vector import SyncVectorEnv
+from gymnasium.wrappers import RecordEpisodeStatistics
+from minigrid.wrappers import FullyObsWrapper
 
 from rllte.env import (
     make_atari_env,
@@ -8,7 +13,10 @@ from rllte.env import (
     make_envpool_procgen_env,
     make_minigrid_env,
     make_procgen_env,
+    make_torch_minigrid_env,
 )
+from rllte.env.minigrid import Minigrid2Image, _hwc_to_chw
+from rllte.env.utils import AsyncBatchVectorEnv, FrameStack, Gymnasium2Torch, RecordEpisodeStatistics4VecEnv
 
 
 @pytest.mark.parametrize(
@@ -19,13 +27,14 @@ from rllte.env import (
         make_procgen_env,
         make_dmc_env,
         make_envpool_atari_env,
-        make_envpool_procgen_env
+        make_envpool_procgen_env,
+        make_torch_minigrid_env,
     ],
 )
 @pytest.mark.parametrize("device", ["cuda", "cpu"])
 def test_discrete_env(env_cls, device):
     num_envs = 3
-    if env_cls in [make_procgen_env]:
+    if env_cls in [make_procgen_env, make_torch_minigrid_env]:
         env = env_cls(device=device, num_envs=num_envs)
     else:
         # when set `asynchronous=True` for all the envs, 
@@ -39,7 +48,7 @@ def test_discrete_env(env_cls, device):
         action = env.action_space.sample()
 
         if env_cls in [make_atari_env, make_minigrid_env, make_procgen_env, 
-                       make_envpool_atari_env, make_envpool_procgen_env]:
+                       make_envpool_atari_env, make_envpool_procgen_env, make_torch_minigrid_env]:
             action = th.randint(0, env.action_space.n, (num_envs,)).to(device)
         else:
             action = th.rand(size=(num_envs, env.action_space.shape[0])).to(device)
@@ -48,3 +57,166 @@ def test_discrete_env(env_cls, device):
     env.close()
 
     print("Environment test passed!")
+
+
+def test_async_batch_env():
+    num_envs, batch_size = 4, 2
+
+    def make_env():
+        return gym.make("CartPole-v1")
+
+    env = AsyncBatchVectorEnv([make_env for _ in range(num_envs)], batch_size=batch_size)
+    obs, infos = env.reset(seed=0)
+    assert obs.shape[0] == batch_size
+    assert infos["env_id"].tolist() == [0, 1]
+    # the environments held back by `reset` come first as reset results
+    obs, rews, terms, truncs, infos = env.step(np.zeros(batch_size, dtype=np.int64))
+    assert infos["env_id"].tolist() == [2, 3]
+    assert infos["_reset"].all() and (rews == 0).all()
+
+    returned = set()
+    for step in range(50):
+        if step == 10:
+            # the calls wait for the pending steps, which must still be returned afterwards
+            assert len(env.get_attr("spec")) == num_envs
+            returned.clear()
+        obs, rews, terms, truncs, infos = env.step(np.zeros(batch_size, dtype=np.int64))
+        assert obs.shape[0] == rews.shape[0] == batch_size
+        assert len(set(infos["env_id"].tolist())) == batch_size
+        returned.update(infos["env_id"].tolist())
+    assert returned == set(range(num_envs))
+
+    with pytest.raises(AssertionError):
+        env.step(np.zeros(num_envs, dtype=np.int64))
+    # the agents store the transitions by row, so partial batches are rejected
+    with pytest.raises(AssertionError):
+        Gymnasium2Torch(env, device="cpu")
+    env.close()
+    assert env.closed
+
+    print("Async batch environment test passed!")
+
+
+def test_device_frame_stack():
+    num_envs, frame_stack, max_steps = 4, 3, 7
+
+    # reference pipeline, which stacks the frames in each sub-environment
+    def make_env():
+        env = FullyObsWrapper(gym.make("MiniGrid-Empty-5x5-v0", max_steps=max_steps))
+        return FrameStack(Minigrid2Image(env), k=frame_stack)
+
+    ref_env = SyncVectorEnv([make_env for _ in range(num_envs)])
+    env = make_minigrid_env(
+        env_id="MiniGrid-Empty-5x5-v0", num_envs=num_envs, frame_stack=frame_stack, device="cpu", asynchronous=False
+    )
+    for sub_env in env.unwrapped.envs:
+        sub_env.unwrapped.max_steps = max_steps
+    assert env.observation_space == ref_env.single_observation_space
+
+    ref_obs, _ = ref_env.reset(seed=0)
+    obs, _ = env.reset(seed=0)
+    assert np.array_equal(ref_obs, obs.numpy())
+
+    rng = np.random.default_rng(0)
+    num_dones = 0
+    for _ in range(60):
+        actions = rng.integers(0, 3, num_envs)
+        ref_obs, _, ref_terms, ref_truncs, ref_infos = ref_env.step(actions)
+        obs, _, _, _, infos = env.step(th.as_tensor(actions))
+        assert np.array_equal(ref_obs, obs.numpy())
+        for idx in np.flatnonzero(ref_terms | ref_truncs):
+            assert np.array_equal(ref_infos["final_observation"][idx], np.asarray(infos["final_observation"][idx]))
+            num_dones += 1
+    assert num_dones > 0
+    ref_env.close()
+    env.close()
+
+    print("Device frame stack test passed!")
+
+
+def test_record_episode_statistics():
+    num_envs, batch_size = 4, 2
+
+    def make_env():
+        return gym.make("CartPole-v1")
+
+    ref_env = RecordEpisodeStatistics(SyncVectorEnv([make_env for _ in range(num_envs)]))
+    env = RecordEpisodeStatistics4VecEnv(SyncVectorEnv([make_env for _ in range(num_envs)]))
+    ref_env.reset(seed=0)
+    env.reset(seed=0)
+    num_dones = 0
+    for _ in range(200):
+        actions = ref_env.action_space.sample()
+        *_, ref_infos = ref_env.step(actions)
+        *_, infos = env.step(actions)
+        assert np.array_equal(ref_infos.get("_episode", np.zeros(num_envs, dtype=bool)), infos["_episode"])
+        for idx in np.flatnonzero(infos["_episode"]):
+            assert infos["episode"]["r"][idx] == ref_infos["episode"]["r"][idx]
+            assert infos["episode"]["l"][idx] == ref_infos["episode"]["l"][idx]
+            num_dones += 1
+    assert num_dones > 0
+    ref_env.close()
+    env.close()
+
+    # with partial batches, only the steps actually taken by each environment are counted
+    env = RecordEpisodeStatistics4VecEnv(AsyncBatchVectorEnv([make_env for _ in range(num_envs)], batch_size=batch_size))
+    env.reset(seed=0)
+    num_steps = np.zeros(num_envs, dtype=np.int32)
+    for _ in range(200):
+        *_, infos = env.step(np.zeros(batch_size, dtype=np.int64))
+        stepped = ~infos["_reset"] if "reset" in infos else np.ones(batch_size, dtype=bool)
+        num_steps[infos["env_id"][stepped]] += 1
+        for idx in np.flatnonzero(infos["_episode"]):
+            assert infos["episode"]["l"][idx] == num_steps[infos["env_id"][idx]]
+            num_steps[infos["env_id"][idx]] = 0
+    env.close()
+
+    print("Episode statistics test passed!")
+
+
+@pytest.mark.parametrize("env_id", ["MiniGrid-Empty-5x5-v0", "MiniGrid-Empty-8x8-v0"])
+def test_torch_minigrid_env(env_id):
+    num_envs = 4
+
+    # reference pipeline, which steps each MiniGrid environment on the host
+    def make_env():
+        return Minigrid2Image(FullyObsWrapper(gym.make(env_id)))
+
+    ref_env = SyncVectorEnv([make_env for _ in range(num_envs)])
+    env = make_torch_minigrid_env(env_id=env_id, num_envs=num_envs, device="cpu")
+    assert env.observation_space == ref_env.single_observation_space
+
+    ref_obs, _ = ref_env.reset(seed=0)
+    obs, _ = env.reset(seed=0)
+    assert np.array_equal(ref_obs, obs.numpy())
+
+    rng = np.random.default_rng(0)
+    num_goals = 0
+    for _ in range(1000):
+        # mostly move forward to reach the goal, with all the other actions from time to time
+        actions = rng.choice([0, 1, 2, 2, 2, 3, 6], num_envs)
+        ref_obs, ref_rews, ref_terms, ref_truncs, ref_infos = ref_env.step(actions)
+        obs, rews, terms, truncs, infos = env.step(th.as_tensor(actions))
+        assert np.array_equal(ref_obs, obs.numpy())
+        assert np.allclose(ref_rews, rews.numpy())
+        assert np.array_equal(ref_terms, terms.numpy().astype(bool))
+        assert np.array_equal(ref_truncs, truncs.numpy().astype(bool))
+        for idx in np.flatnonzero(ref_terms | ref_truncs):
+            assert np.array_equal(ref_infos["final_observation"][idx], infos["final_observation"][idx].numpy())
+        num_goals += int(ref_terms.sum())
+    assert num_goals > 0
+    ref_env.close()
+    env.close()
+
+    print("Torch MiniGrid environment test passed!")
+
+
+@pytest.mark.parametrize("shape", [(7, 7, 3), (5, 8, 3), (64, 64, 3)])
+def test_hwc_to_chw(shape):
+    # compiled by numba when it is installed, plain python otherwise
+    image = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+    chw_image = np.empty((shape[2], shape[0], shape[1]), dtype=np.uint8)
+    _hwc_to_chw(image, chw_image)
+    assert np.array_equal(chw_image, np.ascontiguousarray(image.transpose(2, 0, 1)))
+
+    print("HWC to CHW test passed!")